@@ -5,26 +5,77 @@ Tests sequential vs concurrent API requests to OpenAI using the same API key.
 """
 
 import os
+import sys
+import ssl
 import time
+import atexit
+import gc
+import math
+import shelve
+import hashlib
+import argparse
+import importlib.util
+import re
+import random
 import asyncio
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from datetime import datetime
-from openai import OpenAI
+from collections import defaultdict
+from dataclasses import dataclass, field, asdict
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from statistics import fmean
+from typing import Optional
+from openai import (
+    AsyncOpenAI,
+    APIStatusError,
+    APIConnectionError,
+    APITimeoutError,
+    AuthenticationError,
+    InternalServerError,
+    RateLimitError,
+)
 import json
 import httpx
 
-# Initialize OpenAI client with timeout and connection limits
-http_client = httpx.Client(
-    limits=httpx.Limits(
-        max_connections=500,  # Allow up to 500 concurrent connections
-        max_keepalive_connections=100
-    ),
-    timeout=httpx.Timeout(60.0, connect=10.0)  # 60s total, 10s connect timeout
+try:
+    import orjson  # Faster JSON encoding for the results file
+except ImportError:
+    orjson = None
+
+try:
+    import uvloop  # Faster event loop, not available on Windows
+except ImportError:
+    uvloop = None
+
+# Connection limits and timeouts for the shared HTTP client.
+# With HTTP/2 all requests multiplex over one connection; the high cap only matters
+# for the HTTP/1.1 fallback, where every in-flight request needs its own connection.
+HTTP_LIMITS = httpx.Limits(
+    max_connections=500,  # Allow up to 500 concurrent connections
+    max_keepalive_connections=100,
+    keepalive_expiry=30.0  # Keep idle connections for reuse between tests
+)
+REQUEST_TIMEOUT = 30.0  # Seconds; a stalled request fails as TIMEOUT instead of holding up the test
+HTTP_TIMEOUT = httpx.Timeout(REQUEST_TIMEOUT, connect=5.0)
+
+# Build the SSL context once (~10ms) instead of per client
+SSL_CONTEXT = ssl.create_default_context()
+
+# Multiplex requests over one HTTP/2 connection when the h2 package is installed
+HTTP2_ENABLED = importlib.util.find_spec("h2") is not None
+
+# One async OpenAI client shared by every test, so all requests reuse one connection pool.
+# It is opened and closed around the test run in run_tests().
+async_http_client = httpx.AsyncClient(
+    http2=HTTP2_ENABLED,
+    verify=SSL_CONTEXT,
+    limits=HTTP_LIMITS,
+    timeout=HTTP_TIMEOUT
 )
 
-client = OpenAI(
+aclient = AsyncOpenAI(
     api_key=os.getenv('OPENAI_API_KEY'),
-    http_client=http_client,
+    http_client=async_http_client,
+    timeout=HTTP_TIMEOUT,  # Set explicitly so the SDK's 10 minute default never applies
     max_retries=0  # Fail fast, don't retry
 )
 
@@ -32,8 +83,42 @@ client = OpenAI(
 NUM_REQUESTS = 10
 MODEL = "gpt-3.5-turbo"  # Using gpt-3.5-turbo for faster/cheaper tests
 MAX_TOKENS = 100
-
-# Test prompts - 10 different prompts to ensure varied responses
+BATCH_MAX_TOKENS = 4096  # Output token cap for the single batched call (gpt-3.5-turbo's limit)
+TEMPERATURE = 0.7
+CONCURRENCY_LIMIT = 32  # Max requests in flight at once during the concurrent test
+MAX_ATTEMPTS = 3  # Tries per request on rate limit / server / connection errors
+RETRY_BASE_DELAY = 0.25  # Seconds, doubled on every retry
+RETRY_MAX_DELAY = 20.0  # Upper bound for any single backoff, including Retry-After
+
+# Client-side pacing (enabled with --rpm); shrinks when the API reports low remaining quota
+RATE_LIMIT_RPM = 0  # 0 disables pacing
+RATE_LIMIT_LOW_REMAINING = 0.1  # Slow down once under 10% of the request quota is left
+rate_limiter = None
+
+# Circuit breaker: stop calling the API after repeated consecutive failures
+CIRCUIT_BREAKER_THRESHOLD = 3  # Consecutive failures before the breaker opens
+CIRCUIT_BREAKER_COOLDOWN = 30.0  # Seconds to short-circuit before letting a request through again
+
+# Progress output: buffered by default, printed live with --verbose
+VERBOSE = False
+PROGRESS_FLUSH_LINES = 64
+_progress_lines = []
+
+# Response cache configuration (on automatically for deterministic runs, or with --use-cache)
+CACHE_PATH = ".llm_cache"
+USE_CACHE = TEMPERATURE == 0
+cache_stats = {"hits": 0, "misses": 0}
+_response_cache = None
+_memory_cache = {}  # In-process tier in front of the on-disk cache
+_cache_keys = {}  # On-disk cache keys, so each payload is JSON-encoded and hashed once
+
+# Semantic cache configuration (enabled with --semantic-cache)
+SEMANTIC_CACHE_PATH = ".semantic_cache.json"
+SEMANTIC_SIMILARITY_THRESHOLD = 0.92
+EMBEDDING_MODEL = "text-embedding-3-small"
+semantic_cache = None
+
+# Test prompts - 10 different prompts to ensure varied responses (cycled when NUM_REQUESTS > 10)
 TEST_PROMPTS = [
     "What is the capital of France?",
     "Explain photosynthesis in one sentence.",
@@ -47,75 +132,660 @@ TEST_PROMPTS = [
     "What is the chemical symbol for gold?"
 ]
 
+# Chat messages for each prompt, built once and reused by every request
+SYSTEM_MSG = {"role": "system", "content": "You are a helpful assistant. Answer concisely."}
+PROMPT_MESSAGES = [[SYSTEM_MSG, {"role": "user", "content": prompt}] for prompt in TEST_PROMPTS]
+BATCH_SYSTEM_MSG = {
+    "role": "system",
+    "content": "You are a helpful assistant. Answer each numbered question concisely "
+               "on its own line, prefixed with its number."
+}
+
+
+def get_response_cache():
+    """
+    Open the on-disk response cache on first use
+    """
+    global _response_cache
+    if _response_cache is None:
+        _response_cache = shelve.open(CACHE_PATH)
+        atexit.register(_response_cache.close)
+    return _response_cache
+
+
+def cache_key(messages):
+    """
+    Deterministic cache key for a request payload, hashed once per distinct payload
+    """
+    memory_key = memory_cache_key(messages)
+    key = _cache_keys.get(memory_key)
+    if key is None:
+        payload = {"model": MODEL, "messages": messages, "max_tokens": MAX_TOKENS, "temperature": TEMPERATURE}
+        key = hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+        _cache_keys[memory_key] = key
+    return key
+
+
+def memory_cache_key(messages):
+    """
+    Cheap in-process cache key: no JSON encoding or hashing needed
+    """
+    return (MODEL, messages[0]["content"], messages[1]["content"], MAX_TOKENS, TEMPERATURE)
+
+
+def elapsed_seconds(start_ns):
+    """
+    Seconds elapsed since a time.perf_counter_ns() reading
+    """
+    return (time.perf_counter_ns() - start_ns) / 1e9
+
+
+def lookup_cached_result(prompt_index, messages):
+    """
+    Return a result dict for a cached response, or None on a miss.
+    Checks the in-process cache first, then the on-disk cache.
+    """
+    if not USE_CACHE:
+        return None
+
+    start_time = time.perf_counter_ns()
+    memory_key = memory_cache_key(messages)
+    response_text = _memory_cache.get(memory_key)
+    if response_text is None:
+        response_text = get_response_cache().get(cache_key(messages))
+        if response_text is None:
+            cache_stats["misses"] += 1
+            return None
+        _memory_cache[memory_key] = response_text
+
+    cache_stats["hits"] += 1
+    result = build_success_result(prompt_index, response_text, elapsed_seconds(start_time))
+    result["cached"] = True
+    return result
+
+
+def store_cached_response(messages, response_text):
+    """
+    Save a successful response to both cache tiers
+    """
+    if USE_CACHE:
+        _memory_cache[memory_cache_key(messages)] = response_text
+        get_response_cache()[cache_key(messages)] = response_text
+
+
+class SemanticCache:
+    """
+    Embedding-based cache that serves stored responses for near-duplicate prompts.
+    Vectors are kept normalized so cosine similarity is a plain dot product.
+    Each entry records the request parameters it was generated with, and only
+    entries with matching parameters are considered on lookup.
+    """
+
+    def __init__(self, path, threshold):
+        self.path = path
+        self.threshold = threshold
+        self.vectors = []
+        self.params = []
+        self.responses = []
+        self.hits = 0
+        self.misses = 0
+
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            # Files written before entries carried their parameters can't be matched safely
+            if "params" in data:
+                self.vectors = data["vectors"]
+                self.params = data["params"]
+                self.responses = data["responses"]
+
+    @staticmethod
+    def normalize(vector):
+        norm = math.sqrt(sum(x * x for x in vector))
+        return [x / norm for x in vector] if norm else vector
+
+    def lookup(self, vector, params):
+        """
+        Return the cached response most similar to vector among entries generated with
+        the same params, or None if below threshold
+        """
+        best_score = -1.0
+        best_index = None
+        for i, cached_vector in enumerate(self.vectors):
+            if self.params[i] != params:
+                continue
+            score = sum(a * b for a, b in zip(vector, cached_vector))
+            if score > best_score:
+                best_score, best_index = score, i
+
+        if best_index is not None and best_score > self.threshold:
+            self.hits += 1
+            return self.responses[best_index]
+
+        self.misses += 1
+        return None
+
+    def add(self, vector, params, response_text):
+        self.vectors.append(vector)
+        self.params.append(params)
+        self.responses.append(response_text)
+
+    def save(self):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({"vectors": self.vectors, "params": self.params, "responses": self.responses}, f)
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class RequestRateLimiter:
+    """
+    Token bucket that paces request starts to stay under a requests-per-minute budget.
+    Each acquire() reserves a token up front, so no lock is needed on a single event loop.
+    """
+
+    def __init__(self, rpm):
+        self.rpm = rpm
+        self.configured_rate = rpm / 60.0  # Tokens per second
+        self.rate = self.configured_rate
+        self.capacity = max(1.0, self.rate)  # Allow up to one second of burst
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.slowed_until = None  # When the quota window behind a lowered rate resets
+
+    async def acquire(self):
+        now = time.monotonic()
+        if self.slowed_until is not None and now >= self.slowed_until:
+            # The quota window has reset, so go back to the configured pace
+            self.rate = self.configured_rate
+            self.capacity = max(1.0, self.rate)
+            self.slowed_until = None
+
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+        self.tokens -= 1
+        if self.tokens < 0:
+            await asyncio.sleep(-self.tokens / self.rate)
+
+    def update_from_headers(self, headers):
+        """
+        Shrink the rate when x-ratelimit headers show the request quota running low,
+        spreading the remaining requests over the time left until the window resets.
+        acquire() restores the configured rate once that reset time has passed.
+        """
+        try:
+            limit = int(headers["x-ratelimit-limit-requests"])
+            remaining = int(headers["x-ratelimit-remaining-requests"])
+            reset_seconds = parse_reset_duration(headers["x-ratelimit-reset-requests"])
+        except (KeyError, ValueError):
+            return
+
+        if remaining < limit * RATE_LIMIT_LOW_REMAINING and reset_seconds > 0:
+            self.rate = min(self.rate, max(remaining, 1) / reset_seconds)
+            self.capacity = max(1.0, self.rate)
+            self.slowed_until = time.monotonic() + reset_seconds
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised in place of an API call while the circuit breaker is open
+    """
+
+
+class MissingAnswerError(Exception):
+    """
+    Recorded for a prompt whose answer is missing from the batched response
+    """
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failures so the remaining requests fail instantly
+    instead of each waiting out a timeout. After `cooldown` seconds one probe request is
+    let through (half-open); a success closes the breaker, a failure reopens it.
+
+    allow() is checked when a request starts, so the breaker can't stop requests that are
+    already in flight: in the concurrent test it only short-circuits requests still waiting
+    for a semaphore slot (i.e. when NUM_REQUESTS exceeds CONCURRENCY_LIMIT).
+    """
+
+    def __init__(self, threshold, cooldown):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.open_until = 0.0
+        self.half_open = False  # A probe request is in flight
+
+    def allow(self):
+        if self.failures < self.threshold:
+            return True
+        if self.half_open or time.monotonic() < self.open_until:
+            return False
+        self.half_open = True
+        return True
+
+    def record_failure(self):
+        self.failures += 1
+        self.half_open = False
+        if self.failures >= self.threshold:
+            self.open_until = time.monotonic() + self.cooldown
+
+    def reset(self):
+        self.failures = 0
+        self.open_until = 0.0
+        self.half_open = False
+
+
+circuit_breaker = CircuitBreaker(CIRCUIT_BREAKER_THRESHOLD, CIRCUIT_BREAKER_COOLDOWN)
+
+
+def parse_reset_duration(value):
+    """
+    Parse an x-ratelimit-reset value such as "20ms", "1s" or "6m0s" into seconds
+    """
+    units = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+    parts = re.findall(r"(\d+(?:\.\d+)?)(ms|s|m|h)", value)
+    if not parts:
+        raise ValueError(f"Unrecognized reset duration: {value}")
+    return sum(float(amount) * units[unit] for amount, unit in parts)
+
+
+async def embed_prompt(prompt_index):
+    """
+    Embed a test prompt for the semantic cache. Returns None if embedding fails,
+    in which case the request goes to the API without a semantic lookup.
+    """
+    try:
+        response = await aclient.embeddings.create(model=EMBEDDING_MODEL, input=TEST_PROMPTS[prompt_index % len(TEST_PROMPTS)])
+        return SemanticCache.normalize(response.data[0].embedding)
+    except Exception as e:
+        error_type, _ = classify_error(e)
+        line = f"Request {prompt_index+1}: ⚠ Embedding failed ({error_type}), skipping semantic cache: {e}"
+        if VERBOSE:
+            print(line)
+        else:
+            log_progress(line)
+        return None
+
+
+def semantic_cache_params():
+    """
+    Request parameters a semantic cache entry must match, as a JSON-friendly list
+    """
+    return [EMBEDDING_MODEL, MODEL, SYSTEM_MSG["content"], MAX_TOKENS, TEMPERATURE]
+
+
+def lookup_semantic_result(prompt_index, vector, start_time):
+    """
+    Return a result dict for a semantically similar cached response, or None
+    """
+    if vector is None:
+        return None
+
+    response_text = semantic_cache.lookup(vector, semantic_cache_params())
+    if response_text is None:
+        return None
+
+    result = build_success_result(prompt_index, response_text, elapsed_seconds(start_time))
+    result["cached"] = True
+    return result
+
+
+def store_semantic_response(vector, response_text):
+    """
+    Add a successful response to the semantic cache
+    """
+    if semantic_cache is not None and vector is not None:
+        semantic_cache.add(vector, semantic_cache_params(), response_text)
+
+
+def is_retryable(error):
+    """
+    Whether an API error is transient: connection problems, 408, 429 or 5xx
+    """
+    if isinstance(error, APIStatusError):
+        return error.status_code in (408, 429) or error.status_code >= 500
+    return isinstance(error, APIConnectionError)
+
+
+def parse_retry_after(error):
+    """
+    Seconds the server asked us to wait (retry-after-ms / Retry-After headers), or None
+    """
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+
+    headers = response.headers
+    try:
+        if "retry-after-ms" in headers:
+            return float(headers["retry-after-ms"]) / 1000
+        if "retry-after" in headers:
+            value = headers["retry-after"]
+            try:
+                return float(value)
+            except ValueError:
+                # HTTP-date form
+                return (parsedate_to_datetime(value) - datetime.now(tz=timezone.utc)).total_seconds()
+    except (TypeError, ValueError):
+        pass
+    return None
+
+
+def retry_delay(attempt, error=None):
+    """
+    Delay before retrying after the given (0-based) attempt. Honors Retry-After when
+    present, otherwise uses exponential backoff with jitter so retries don't arrive in lockstep.
+    """
+    retry_after = parse_retry_after(error)
+    if retry_after is not None and retry_after >= 0:
+        return min(RETRY_MAX_DELAY, retry_after)
+    return min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt) * random.uniform(0.5, 1.5)
+
+
+# Error classification by OpenAI SDK exception type: (error_type, error_code)
+_EXC_MAP = {
+    RateLimitError: ("RATE_LIMIT", 429),
+    APITimeoutError: ("TIMEOUT", None),
+    AuthenticationError: ("AUTH_ERROR", 401),
+    InternalServerError: ("SERVER_ERROR", 500),
+    APIConnectionError: ("CONNECTION_ERROR", None),
+    CircuitOpenError: ("SHORT_CIRCUITED", None),
+    MissingAnswerError: ("MISSING_ANSWER", None),
+}
+
+
+def classify_error(error):
+    """
+    Classify an exception into an error type and HTTP status code.
+    Returns: (error_type, error_code)
+    """
+    if isinstance(error, APIStatusError) and error.status_code == 503:
+        return "SERVICE_UNAVAILABLE", 503
+
+    # Walk the MRO so subclasses (e.g. APITimeoutError < APIConnectionError) resolve to the closest match
+    error_type, error_code = "OTHER", None
+    for exc_type in type(error).__mro__:
+        if exc_type in _EXC_MAP:
+            error_type, error_code = _EXC_MAP[exc_type]
+            break
+
+    # Status errors carry the real HTTP status, e.g. 502/504 rather than a generic 500
+    if isinstance(error, APIStatusError):
+        error_code = error.status_code
+    return error_type, error_code
+
+
+def build_success_result(prompt_index, response_text, duration, ttft=None, http_version=None):
+    """
+    Build the result dict for a successful request
+    """
+    return {
+        "index": prompt_index,
+        "prompt": TEST_PROMPTS[prompt_index % len(TEST_PROMPTS)],
+        "response": response_text,
+        "duration": round(duration, 2),
+        "ttft": round(ttft, 2) if ttft is not None else None,
+        "http_version": http_version,
+        "attempts": 0,
+        "success": True,
+        "cached": False,
+        "error_type": None,
+        "error_code": None
+    }
+
+
+def build_error_result(prompt_index, error, duration):
+    """
+    Build the result dict for a failed request
+    """
+    error_str = str(error) or type(error).__name__  # e.g. CancelledError has no message
+    error_type, error_code = classify_error(error)
+
+    return {
+        "index": prompt_index,
+        "prompt": TEST_PROMPTS[prompt_index % len(TEST_PROMPTS)],
+        "response": None,
+        "error": error_str,
+        "error_type": error_type,
+        "error_code": error_code,
+        "duration": round(duration, 2),
+        "ttft": None,
+        "http_version": None,
+        "attempts": 0,
+        "success": False,
+        "cached": False
+    }
+
 
-def make_single_request(prompt_index):
+async def make_single_request(prompt_index):
     """
     Make a single request to OpenAI API.
-    Returns: (prompt_index, response_text, duration_seconds)
+    Returns: result dict (see build_success_result / build_error_result)
     """
-    prompt = TEST_PROMPTS[prompt_index]
-    start_time = time.time()
-    error_type = None
-    error_code = None
+    messages = PROMPT_MESSAGES[prompt_index % len(TEST_PROMPTS)]
+    cached_result = lookup_cached_result(prompt_index, messages)
+    if cached_result is not None:
+        return cached_result
+
+    start_time = time.perf_counter_ns()
+
+    # The embedding round trip counts toward a semantic hit's duration and the test's
+    # total time, but not toward a miss: each API attempt restarts start_time below
+    vector = None
+    if semantic_cache is not None:
+        vector = await embed_prompt(prompt_index)
+        semantic_result = lookup_semantic_result(prompt_index, vector, start_time)
+        if semantic_result is not None:
+            return semantic_result
+
+    if not circuit_breaker.allow():
+        return build_error_result(prompt_index, CircuitOpenError("Circuit breaker open, request skipped"), 0.0)
+    is_probe = circuit_breaker.half_open  # allow() just admitted this request as the half-open probe
+
+    attempts = 0
+    try:
+        for attempt in range(MAX_ATTEMPTS):
+            attempts = attempt + 1
+            if rate_limiter is not None:
+                await rate_limiter.acquire()
+
+            start_time = time.perf_counter_ns()  # Time only the attempt that counts
+            try:
+                stream = await aclient.chat.completions.create(
+                    model=MODEL,
+                    messages=messages,
+                    max_tokens=MAX_TOKENS,
+                    temperature=TEMPERATURE,
+                    stream=True
+                )
+                break
+            except (APIStatusError, APIConnectionError) as e:
+                if attempts == MAX_ATTEMPTS or not is_retryable(e):
+                    raise
+                await asyncio.sleep(retry_delay(attempt, e))
+
+        if rate_limiter is not None:
+            rate_limiter.update_from_headers(stream.response.headers)
+
+        # Record time to first token as chunks arrive
+        ttft = None
+        chunks = []
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            content = chunk.choices[0].delta.content
+            if content:
+                # The first chunk usually carries only the role, so wait for actual text
+                if ttft is None:
+                    ttft = elapsed_seconds(start_time)
+                chunks.append(content)
+
+        duration = elapsed_seconds(start_time)
+        response_text = "".join(chunks)
+        store_cached_response(messages, response_text)
+        store_semantic_response(vector, response_text)
+        result = build_success_result(prompt_index, response_text, duration, ttft, stream.response.http_version)
+        circuit_breaker.reset()
+
+    except Exception as e:
+        circuit_breaker.record_failure()
+        result = build_error_result(prompt_index, e, elapsed_seconds(start_time))
+
+    finally:
+        # A cancelled probe records no outcome; don't leave the breaker waiting on it forever
+        if is_probe:
+            circuit_breaker.half_open = False
+
+    result["attempts"] = attempts
+    return result
+
+
+def parse_batched_answers(content, count):
+    """
+    Split a batched response into {question_number: answer} from lines like "3. answer".
+    Question numbers must increase and fall in 1..count; any other line, including a
+    numbered list inside an answer, is appended to the current answer.
+    """
+    answers = {}
+    current = 0
+    for line in content.splitlines():
+        match = re.match(r"\s*(\d+)[.):]\s*(.*)", line)
+        if match and current < int(match.group(1)) <= count:
+            current = int(match.group(1))
+            answers[current] = match.group(2)
+        elif current and line.strip():
+            answers[current] += "\n" + line.strip()
+    return answers
+
+
+async def make_batched_request():
+    """
+    Ask all NUM_REQUESTS prompts in one chat completion (request collapsing).
+    Returns: one result dict per prompt, in order, each carrying the full call duration
+    """
+    user_content = "\n".join(f"{i+1}. {TEST_PROMPTS[i % len(TEST_PROMPTS)]}" for i in range(NUM_REQUESTS))
+    start_time = time.perf_counter_ns()
 
     try:
-        response = client.chat.completions.create(
+        response = await aclient.chat.completions.create(
             model=MODEL,
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant. Answer concisely."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=MAX_TOKENS,
-            temperature=0.7
+            messages=[BATCH_SYSTEM_MSG, {"role": "user", "content": user_content}],
+            max_tokens=min(MAX_TOKENS * NUM_REQUESTS, BATCH_MAX_TOKENS),
+            temperature=TEMPERATURE
         )
 
-        duration = time.time() - start_time
-        response_text = response.choices[0].message.content.strip()
+        duration = elapsed_seconds(start_time)
+        answers = parse_batched_answers(response.choices[0].message.content, NUM_REQUESTS)
 
-        return {
-            "index": prompt_index,
-            "prompt": prompt,
-            "response": response_text,
-            "duration": round(duration, 2),
-            "success": True,
-            "error_type": None,
-            "error_code": None
-        }
+        # Split the single response back into one result per prompt
+        results = []
+        for i in range(NUM_REQUESTS):
+            if i + 1 in answers:
+                results.append(build_success_result(i, answers[i + 1], duration))
+            else:
+                results.append(build_error_result(i, MissingAnswerError("Missing answer in batched response"), duration))
+        return results
 
     except Exception as e:
-        duration = time.time() - start_time
-
-        # Classify error types
-        error_str = str(e)
-        if "rate_limit" in error_str.lower() or "429" in error_str:
-            error_type = "RATE_LIMIT"
-            error_code = 429
-        elif "timeout" in error_str.lower():
-            error_type = "TIMEOUT"
-        elif "503" in error_str or "service unavailable" in error_str.lower():
-            error_type = "SERVICE_UNAVAILABLE"
-            error_code = 503
-        elif "500" in error_str or "internal server" in error_str.lower():
-            error_type = "SERVER_ERROR"
-            error_code = 500
-        elif "401" in error_str or "unauthorized" in error_str.lower():
-            error_type = "AUTH_ERROR"
-            error_code = 401
-        elif "connection" in error_str.lower():
-            error_type = "CONNECTION_ERROR"
-        else:
-            error_type = "OTHER"
+        duration = elapsed_seconds(start_time)
+        return [build_error_result(i, e, duration) for i in range(NUM_REQUESTS)]
+
 
-        return {
-            "index": prompt_index,
-            "prompt": prompt,
-            "response": None,
-            "error": error_str,
-            "error_type": error_type,
-            "error_code": error_code,
-            "duration": round(duration, 2),
-            "success": False
-        }
+def log_progress(line):
+    """
+    Buffer a progress line, writing to stdout every PROGRESS_FLUSH_LINES lines
+    """
+    _progress_lines.append(line)
+    if len(_progress_lines) >= PROGRESS_FLUSH_LINES:
+        flush_progress()
+
+
+def flush_progress():
+    """
+    Write any buffered progress lines to stdout in a single call
+    """
+    if _progress_lines:
+        sys.stdout.write("\n".join(_progress_lines) + "\n")
+        _progress_lines.clear()
+
+
+@dataclass
+class Summary:
+    """
+    Aggregate statistics for one test's results. Cached results count as successful
+    but are excluded from the latency fields.
+    """
+    successful: int = 0
+    failed: int = 0
+    cached: int = 0
+    measured: int = 0
+    avg_duration: float = 0.0
+    min_duration: float = 0.0
+    max_duration: float = 0.0
+    avg_ttft: Optional[float] = None
+    http_versions: list = field(default_factory=list)
+    retried: int = 0
+    retries: int = 0
+
+
+def summarize_results(results):
+    """
+    Count successes/failures and aggregate durations in a single pass over results
+    """
+    successful = failed = cached = 0
+    total_duration = 0.0
+    min_duration = float("inf")
+    max_duration = 0.0
+    total_ttft = 0.0
+    ttft_count = 0
+    http_versions = set()
+    retried = 0
+    retries = 0
+
+    for r in results:
+        if r["attempts"] > 1:
+            retried += 1
+            retries += r["attempts"] - 1
+
+        if not r["success"]:
+            failed += 1
+            continue
+
+        successful += 1
+        if r["cached"]:
+            # Served without an API call - keep it out of the latency metrics
+            cached += 1
+            continue
+
+        duration = r["duration"]
+        total_duration += duration
+        if duration < min_duration:
+            min_duration = duration
+        if duration > max_duration:
+            max_duration = duration
+        if r["ttft"] is not None:
+            total_ttft += r["ttft"]
+            ttft_count += 1
+        if r["http_version"]:
+            http_versions.add(r["http_version"])
+
+    measured = successful - cached
+    return Summary(
+        successful=successful,
+        failed=failed,
+        cached=cached,
+        measured=measured,
+        avg_duration=total_duration / measured if measured else 0.0,
+        min_duration=min_duration if measured else 0.0,
+        max_duration=max_duration,
+        avg_ttft=total_ttft / ttft_count if ttft_count else None,
+        http_versions=sorted(http_versions),
+        retried=retried,
+        retries=retries
+    )
 
 
 def analyze_errors(results):
@@ -127,30 +797,23 @@ def analyze_errors(results):
     if not failed_requests:
         return None
 
-    error_breakdown = {}
+    error_breakdown = defaultdict(lambda: {"count": 0, "examples": [], "durations": []})
     for result in failed_requests:
-        error_type = result.get("error_type", "UNKNOWN")
-        if error_type not in error_breakdown:
-            error_breakdown[error_type] = {
-                "count": 0,
-                "examples": [],
-                "avg_duration": []
-            }
-        error_breakdown[error_type]["count"] += 1
-        error_breakdown[error_type]["avg_duration"].append(result["duration"])
-        if len(error_breakdown[error_type]["examples"]) < 2:  # Store up to 2 examples
-            error_breakdown[error_type]["examples"].append({
+        entry = error_breakdown[result.get("error_type", "UNKNOWN")]
+        entry["count"] += 1
+        entry["durations"].append(result["duration"])
+        if len(entry["examples"]) < 2:  # Store up to 2 examples
+            entry["examples"].append({
                 "index": result["index"],
                 "error": result.get("error", "Unknown"),
                 "duration": result["duration"]
             })
 
-    # Calculate average durations
-    for error_type in error_breakdown:
-        durations = error_breakdown[error_type]["avg_duration"]
-        error_breakdown[error_type]["avg_duration"] = round(sum(durations) / len(durations), 2)
+    # Replace the collected durations with their average
+    for entry in error_breakdown.values():
+        entry["avg_duration"] = round(fmean(entry.pop("durations")), 2)
 
-    return error_breakdown
+    return dict(error_breakdown)
 
 
 def print_error_analysis(error_breakdown):
@@ -172,18 +835,15 @@ def print_error_analysis(error_breakdown):
             print(f"    - Request {ex['index'] + 1}: {ex['error'][:100]}...")
 
 
-def print_performance_warnings(results, total_duration):
+def print_performance_warnings(summary):
     """
-    Print warnings about performance degradation
+    Print warnings about performance degradation, using the test's precomputed Summary
     """
-    successful_requests = [r for r in results if r["success"]]
-
-    if not successful_requests:
+    if not summary.measured:
         return
 
-    individual_times = [r["duration"] for r in successful_requests]
-    avg_time = sum(individual_times) / len(individual_times)
-    max_time = max(individual_times)
+    avg_time = summary.avg_duration
+    max_time = summary.max_duration
 
     warnings = []
 
@@ -199,9 +859,19 @@ def print_performance_warnings(results, total_duration):
     elif max_time > 10:
         warnings.append(f"⚠ WARNING: Maximum response time was {round(max_time, 2)}s (> 10s - very slow)")
 
+    # Time to first token shows API responsiveness separately from generation time
+    avg_ttft = summary.avg_ttft
+    if avg_ttft is not None:
+        if avg_ttft > 5:
+            warnings.append(f"⚠ CRITICAL: Average time to first token is {round(avg_ttft, 2)}s (> 5s - requests are queuing)")
+        elif avg_ttft > 2:
+            warnings.append(f"⚠ WARNING: Average time to first token is {round(avg_ttft, 2)}s (> 2s - slow to start responding)")
+        elif avg_ttft > 1:
+            warnings.append(f"⚠ NOTE: Average time to first token is {round(avg_ttft, 2)}s (> 1s)")
+
     # Check for variance
-    if len(individual_times) > 1:
-        variance = max(individual_times) - min(individual_times)
+    if summary.measured > 1:
+        variance = summary.max_duration - summary.min_duration
         if variance > 5:
             warnings.append(f"⚠ High variance in response times: {round(variance, 2)}s difference between fastest and slowest")
 
@@ -213,7 +883,23 @@ def print_performance_warnings(results, total_duration):
             print(warning)
 
 
-def test_sequential():
+async def warm_up():
+    """
+    Send one untimed request so DNS, TCP and TLS setup happen before the timed tests.
+    Lists models rather than asking for a completion, so no tokens or chat quota are spent.
+    """
+    print("Warming up connection...", end=" ", flush=True)
+    start_time = time.perf_counter_ns()
+
+    try:
+        await aclient.models.list()
+        print(f"✓ Done in {round(elapsed_seconds(start_time), 2)}s\n")
+    except Exception as e:
+        error_type, _ = classify_error(e)
+        print(f"✗ Failed ({error_type}), continuing\n")
+
+
+async def test_sequential():
     """
     Test 1: Sequential requests (one after another)
     """
@@ -222,41 +908,56 @@ def test_sequential():
     print("=" * 80)
     print(f"Sending {NUM_REQUESTS} requests sequentially...\n")
 
+    circuit_breaker.reset()  # Each test starts with a closed breaker
     results = []
-    overall_start = time.time()
+    overall_start = time.perf_counter()
 
     for i in range(NUM_REQUESTS):
-        print(f"Request {i+1}/{NUM_REQUESTS}: Sending...", end=" ", flush=True)
-        result = make_single_request(i)
+        if VERBOSE:
+            print(f"Request {i+1}/{NUM_REQUESTS}: Sending...", end=" ", flush=True)
+        result = await make_single_request(i)
 
         if result["success"]:
-            print(f"✓ Completed in {result['duration']}s")
+            status = f"✓ Completed in {result['duration']}s"
         else:
             error_type = result.get("error_type", "UNKNOWN")
-            print(f"✗ Failed ({error_type}) in {result['duration']}s")
+            status = f"✗ Failed ({error_type}) in {result['duration']}s"
+
+        if VERBOSE:
+            print(status)
+        else:
+            log_progress(f"Request {i+1}/{NUM_REQUESTS}: {status}")
 
         results.append(result)
 
-    overall_duration = time.time() - overall_start
+    overall_duration = time.perf_counter() - overall_start
+    flush_progress()
 
     # Print summary
     print("\n" + "-" * 80)
     print("SEQUENTIAL TEST SUMMARY")
     print("-" * 80)
 
-    successful_requests = [r for r in results if r["success"]]
-    failed_requests = [r for r in results if not r["success"]]
+    summary = summarize_results(results)
 
     print(f"Total requests: {NUM_REQUESTS}")
-    print(f"Successful: {len(successful_requests)}")
-    print(f"Failed: {len(failed_requests)}")
+    print(f"Successful: {summary.successful}")
+    print(f"Failed: {summary.failed}")
+    if summary.retried:
+        print(f"Retried: {summary.retried} request(s), {summary.retries} retry attempt(s)")
+    if summary.cached:
+        print(f"Served from cache: {summary.cached} (excluded from response times)")
     print(f"\nTotal time: {round(overall_duration, 2)}s")
 
-    if successful_requests:
-        individual_times = [r["duration"] for r in successful_requests]
-        print(f"Average individual response time: {round(sum(individual_times) / len(individual_times), 2)}s")
-        print(f"Min response time: {round(min(individual_times), 2)}s")
-        print(f"Max response time: {round(max(individual_times), 2)}s")
+    if summary.measured:
+        print(f"Average individual response time: {round(summary.avg_duration, 2)}s")
+        print(f"Min response time: {round(summary.min_duration, 2)}s")
+        print(f"Max response time: {round(summary.max_duration, 2)}s")
+
+        if summary.avg_ttft is not None:
+            print(f"Average time to first token: {round(summary.avg_ttft, 2)}s")
+        if summary.http_versions:
+            print(f"HTTP version: {', '.join(summary.http_versions)}")
 
     # Error analysis
     error_breakdown = analyze_errors(results)
@@ -264,78 +965,108 @@ def test_sequential():
         print_error_analysis(error_breakdown)
 
     # Performance warnings
-    print_performance_warnings(results, overall_duration)
+    print_performance_warnings(summary)
 
     return {
         "mode": "sequential",
         "total_duration": round(overall_duration, 2),
         "results": results,
-        "successful": len(successful_requests),
-        "failed": len(failed_requests),
+        "successful": summary.successful,
+        "failed": summary.failed,
+        "summary": asdict(summary),
         "error_breakdown": error_breakdown
     }
 
 
-def test_concurrent():
+async def test_concurrent():
     """
-    Test 2: Concurrent requests (all at the same time using threading)
+    Test 2: Concurrent requests (all at the same time on one asyncio event loop)
     """
     print("\n\n")
     print("=" * 80)
     print("TEST 2: CONCURRENT REQUESTS (All At The Same Time)")
     print("=" * 80)
-    print(f"Sending {NUM_REQUESTS} requests concurrently...\n")
+    # Never run more workers than there are requests
+    workers = min(NUM_REQUESTS, CONCURRENCY_LIMIT)
+    print(f"Sending {NUM_REQUESTS} requests concurrently (up to {workers} in flight)...\n")
 
-    results = []
-    overall_start = time.time()
+    circuit_breaker.reset()  # Don't inherit an open breaker from the sequential test
+    overall_start = time.perf_counter()
     completion_times = []  # Track when each request completes
 
-    # Use ThreadPoolExecutor to send all requests concurrently
-    with ThreadPoolExecutor(max_workers=NUM_REQUESTS) as executor:
-        # Submit all requests at once
-        futures = {executor.submit(make_single_request, i): i for i in range(NUM_REQUESTS)}
+    # Bound in-flight requests so large NUM_REQUESTS values run at a fixed concurrency
+    semaphore = asyncio.Semaphore(workers)
 
-        # Collect results as they complete
-        for future in as_completed(futures):
-            request_index = futures[future]
-            result = future.result()
-            completion_time = time.time() - overall_start
+    async def guarded_request(prompt_index):
+        try:
+            async with semaphore:
+                result = await make_single_request(prompt_index)
+        finally:
+            # Record the completion even if the task raised, so timing stats cover every request
+            completion_time = time.perf_counter() - overall_start
             completion_times.append(completion_time)
-            results.append(result)
 
-            if result["success"]:
-                print(f"Request {result['index']+1} ✓ Completed in {result['duration']}s (at T+{round(completion_time, 2)}s)")
-            else:
-                error_type = result.get("error_type", "UNKNOWN")
-                print(f"Request {result['index']+1} ✗ Failed ({error_type}) in {result['duration']}s (at T+{round(completion_time, 2)}s)")
+        # Report progress from the task itself, so results needn't be streamed back
+
+        if result["success"]:
+            line = f"Request {result['index']+1} ✓ Completed in {result['duration']}s (at T+{round(completion_time, 2)}s)"
+        else:
+            error_type = result.get("error_type", "UNKNOWN")
+            line = f"Request {result['index']+1} ✗ Failed ({error_type}) in {result['duration']}s (at T+{round(completion_time, 2)}s)"
 
-    overall_duration = time.time() - overall_start
+        if VERBOSE:
+            print(line)
+        else:
+            log_progress(line)
+
+        return result
+
+    # gather returns results in request order, so no reindexing or sorting is needed.
+    # A task that raises (including a cancelled one) still yields a failed result
+    # instead of aborting the whole test.
+    outcomes = await asyncio.gather(
+        *(guarded_request(i) for i in range(NUM_REQUESTS)),
+        return_exceptions=True
+    )
+    results = [
+        build_error_result(i, outcome, time.perf_counter() - overall_start) if isinstance(outcome, BaseException) else outcome
+        for i, outcome in enumerate(outcomes)
+    ]
+
+    overall_duration = time.perf_counter() - overall_start
+    flush_progress()
 
     # Force cleanup and garbage collection
-    import gc
     gc.collect()
 
-    # Sort results by index for consistent reporting
-    results.sort(key=lambda x: x["index"])
-
     # Print summary
     print("\n" + "-" * 80)
     print("CONCURRENT TEST SUMMARY")
     print("-" * 80)
 
-    successful_requests = [r for r in results if r["success"]]
-    failed_requests = [r for r in results if not r["success"]]
+    summary = summarize_results(results)
 
     print(f"Total requests: {NUM_REQUESTS}")
-    print(f"Successful: {len(successful_requests)}")
-    print(f"Failed: {len(failed_requests)}")
+    print(f"Successful: {summary.successful}")
+    print(f"Failed: {summary.failed}")
+    if summary.retried:
+        print(f"Retried: {summary.retried} request(s), {summary.retries} retry attempt(s)")
+    if summary.cached:
+        print(f"Served from cache: {summary.cached} (excluded from response times)")
     print(f"\nTotal time: {round(overall_duration, 2)}s")
 
-    if successful_requests:
-        individual_times = [r["duration"] for r in successful_requests]
-        print(f"Average individual response time: {round(sum(individual_times) / len(individual_times), 2)}s")
-        print(f"Min response time: {round(min(individual_times), 2)}s")
-        print(f"Max response time: {round(max(individual_times), 2)}s")
+    if summary.measured:
+        print(f"Average individual response time: {round(summary.avg_duration, 2)}s")
+        print(f"Min response time: {round(summary.min_duration, 2)}s")
+        print(f"Max response time: {round(summary.max_duration, 2)}s")
+
+        if summary.avg_ttft is not None:
+            print(f"Average time to first token: {round(summary.avg_ttft, 2)}s")
+        if summary.http_versions:
+            print(f"HTTP version: {', '.join(summary.http_versions)}")
+            if "HTTP/2" not in summary.http_versions:
+                print("⚠ Requests were not multiplexed over HTTP/2 - each in-flight request "
+                      "opened its own connection (pip install 'httpx[http2]')")
 
     # Concurrency metrics
     if len(completion_times) > 1:
@@ -352,44 +1083,117 @@ def test_concurrent():
         print_error_analysis(error_breakdown)
 
     # Performance warnings
-    print_performance_warnings(results, overall_duration)
+    print_performance_warnings(summary)
 
     return {
         "mode": "concurrent",
         "total_duration": round(overall_duration, 2),
         "results": results,
-        "successful": len(successful_requests),
-        "failed": len(failed_requests),
+        "successful": summary.successful,
+        "failed": summary.failed,
+        "summary": asdict(summary),
         "error_breakdown": error_breakdown,
         "completion_times": completion_times
     }
 
 
-def compare_results(sequential_data, concurrent_data):
+async def test_batched():
+    """
+    Test 3: Batched request (all prompts answered by a single API call)
+    """
+    print("\n\n")
+    print("=" * 80)
+    print("TEST 3: BATCHED REQUEST (All Prompts In One Call)")
+    print("=" * 80)
+    print(f"Sending {NUM_REQUESTS} prompts in a single request...\n")
+    if MAX_TOKENS * NUM_REQUESTS > BATCH_MAX_TOKENS:
+        print(f"⚠ Output capped at {BATCH_MAX_TOKENS} tokens; later answers may be cut off and count as failed\n")
+
+    overall_start = time.perf_counter()
+    results = await make_batched_request()
+    overall_duration = time.perf_counter() - overall_start
+
+    status = "✓ Completed" if any(r["success"] for r in results) else "✗ Failed"
+    print(f"Batched request {status} in {round(overall_duration, 2)}s")
+
+    # Print summary
+    print("\n" + "-" * 80)
+    print("BATCHED TEST SUMMARY")
+    print("-" * 80)
+
+    summary = summarize_results(results)
+
+    print(f"Total prompts: {NUM_REQUESTS}")
+    print(f"Answered: {summary.successful}")
+    print(f"Failed: {summary.failed}")
+    print(f"\nTotal time: {round(overall_duration, 2)}s")
+
+    # Error analysis
+    error_breakdown = analyze_errors(results)
+    if error_breakdown:
+        print_error_analysis(error_breakdown)
+
+    return {
+        "mode": "batched",
+        "total_duration": round(overall_duration, 2),
+        "results": results,
+        "successful": summary.successful,
+        "failed": summary.failed,
+        "summary": asdict(summary),
+        "error_breakdown": error_breakdown
+    }
+
+
+async def run_tests():
+    """
+    Run all tests on one event loop so they share the async client's connection pool
+    """
+    async with async_http_client:
+        await warm_up()
+        sequential_data = await test_sequential()
+        concurrent_data = await test_concurrent()
+        batched_data = await test_batched()
+
+    return sequential_data, concurrent_data, batched_data
+
+
+def compare_results(sequential_data, concurrent_data, batched_data):
     """
-    Compare sequential vs concurrent results
+    Compare sequential vs concurrent vs batched results
     """
     print("\n\n")
     print("=" * 80)
-    print("COMPARISON: SEQUENTIAL vs CONCURRENT")
+    print("COMPARISON: SEQUENTIAL vs CONCURRENT vs BATCHED")
     print("=" * 80)
 
     seq_time = sequential_data["total_duration"]
     conc_time = concurrent_data["total_duration"]
     time_saved = seq_time - conc_time
     speedup = seq_time / conc_time if conc_time > 0 else 0
+    # Cache hits return without an API call, so wall times that include them aren't comparable
+    cached = sum(r["cached"] for r in sequential_data["results"] + concurrent_data["results"])
 
     print(f"\nSequential total time:  {seq_time}s")
     print(f"Concurrent total time:  {conc_time}s")
     print(f"Time saved:             {round(time_saved, 2)}s")
     print(f"Speedup:                {round(speedup, 2)}x faster")
-    print(f"\nEfficiency:             {round((time_saved / seq_time) * 100, 1)}% time reduction")
+    efficiency = time_saved / seq_time * 100 if seq_time > 0 else 0
+    print(f"\nEfficiency:             {round(efficiency, 1)}% time reduction")
+
+    batch_time = batched_data["total_duration"]
+    batch_speedup = seq_time / batch_time if batch_time > 0 else 0
+
+    print(f"\nBatched total time:     {batch_time}s ({batched_data['successful']}/{NUM_REQUESTS} answered)")
+    print(f"Batched speedup:        {round(batch_speedup, 2)}x faster than sequential")
 
     print("\n" + "-" * 80)
     print("CONCLUSION")
     print("-" * 80)
 
-    if speedup > 1.5:
+    if cached:
+        print(f"⚠ {cached} response(s) were served from cache, so the speedup does not measure")
+        print("  API concurrency. Re-run with --no-cache and without --semantic-cache for a fair comparison.")
+    elif speedup > 1.5:
         print(f"✓ Concurrent requests are SIGNIFICANTLY faster ({round(speedup, 2)}x speedup)")
         print("✓ One API key CAN handle multiple simultaneous requests")
         print("✓ The bottleneck is NOT the API key, but the server architecture")
@@ -403,58 +1207,49 @@ def compare_results(sequential_data, concurrent_data):
         "sequential_time": seq_time,
         "concurrent_time": conc_time,
         "time_saved": round(time_saved, 2),
-        "speedup": round(speedup, 2)
+        "speedup": round(speedup, 2),
+        "batched_time": batch_time,
+        "batched_speedup": round(batch_speedup, 2),
+        "cached_results": cached
     }
 
 
-def save_responses_to_text(sequential_data, concurrent_data, timestamp):
+def _write_responses(filename, label, results):
     """
-    Save responses to separate text files for manual examination
+    Write one test's responses to a text file, one result at a time
     """
-    # Save sequential responses
-    seq_filename = f"responses_sequential_{timestamp}.txt"
-    with open(seq_filename, 'w', encoding='utf-8') as f:
+    with open(filename, 'w', encoding='utf-8') as f:
         f.write("=" * 80 + "\n")
-        f.write("SEQUENTIAL RESPONSES\n")
+        f.write(f"{label} RESPONSES\n")
         f.write("=" * 80 + "\n\n")
 
-        for result in sequential_data["results"]:
+        for result in results:
             if result["success"]:
                 f.write(f"Request {result['index'] + 1}:\n")
                 f.write(f"Prompt: {result['prompt']}\n")
-                f.write(f"Response: {result['response']}\n")
+                f.write(f"Response: {result['response'].strip()}\n")
                 f.write(f"Duration: {result['duration']}s\n")
-                f.write("-" * 80 + "\n\n")
             else:
                 f.write(f"Request {result['index'] + 1}: FAILED\n")
                 f.write(f"Prompt: {result['prompt']}\n")
                 f.write(f"Error: {result.get('error', 'Unknown error')}\n")
-                f.write("-" * 80 + "\n\n")
+            f.write("-" * 80 + "\n\n")
 
-    # Save concurrent responses
-    conc_filename = f"responses_concurrent_{timestamp}.txt"
-    with open(conc_filename, 'w', encoding='utf-8') as f:
-        f.write("=" * 80 + "\n")
-        f.write("CONCURRENT RESPONSES\n")
-        f.write("=" * 80 + "\n\n")
 
-        for result in concurrent_data["results"]:
-            if result["success"]:
-                f.write(f"Request {result['index'] + 1}:\n")
-                f.write(f"Prompt: {result['prompt']}\n")
-                f.write(f"Response: {result['response']}\n")
-                f.write(f"Duration: {result['duration']}s\n")
-                f.write("-" * 80 + "\n\n")
-            else:
-                f.write(f"Request {result['index'] + 1}: FAILED\n")
-                f.write(f"Prompt: {result['prompt']}\n")
-                f.write(f"Error: {result.get('error', 'Unknown error')}\n")
-                f.write("-" * 80 + "\n\n")
+def save_responses_to_text(sequential_data, concurrent_data, timestamp):
+    """
+    Save responses to separate text files for manual examination
+    """
+    seq_filename = f"responses_sequential_{timestamp}.txt"
+    _write_responses(seq_filename, "SEQUENTIAL", sequential_data["results"])
+
+    conc_filename = f"responses_concurrent_{timestamp}.txt"
+    _write_responses(conc_filename, "CONCURRENT", concurrent_data["results"])
 
     return seq_filename, conc_filename
 
 
-def save_diagnostics(sequential_data, concurrent_data, comparison_data, timestamp):
+def save_diagnostics(sequential_data, concurrent_data, comparison_data, timestamp, test_date):
     """
     Save diagnostic report with error analysis and performance metrics
     """
@@ -465,11 +1260,13 @@ def save_diagnostics(sequential_data, concurrent_data, comparison_data, timestam
         f.write("DIAGNOSTIC REPORT\n")
         f.write("=" * 80 + "\n\n")
 
-        f.write(f"Test Date: {datetime.now().isoformat()}\n")
+        f.write(f"Test Date: {test_date}\n")
         f.write(f"Configuration:\n")
         f.write(f"  - Requests: {NUM_REQUESTS}\n")
+        f.write(f"  - Concurrency Limit: {CONCURRENCY_LIMIT}\n")
         f.write(f"  - Model: {MODEL}\n")
-        f.write(f"  - Max Tokens: {MAX_TOKENS}\n\n")
+        f.write(f"  - Max Tokens: {MAX_TOKENS}\n")
+        f.write(f"  - Response Cache: {'enabled' if USE_CACHE else 'disabled'}\n\n")
 
         # Sequential diagnostics
         f.write("-" * 80 + "\n")
@@ -516,29 +1313,30 @@ def save_diagnostics(sequential_data, concurrent_data, comparison_data, timestam
         f.write("PERFORMANCE ANALYSIS\n")
         f.write("-" * 80 + "\n\n")
 
-        seq_successful = [r for r in sequential_data['results'] if r['success']]
-        conc_successful = [r for r in concurrent_data['results'] if r['success']]
+        seq_summary = sequential_data['summary']
+        conc_summary = concurrent_data['summary']
 
-        if seq_successful:
-            seq_times = [r['duration'] for r in seq_successful]
-            f.write(f"Sequential avg response time: {round(sum(seq_times)/len(seq_times), 2)}s\n")
-            f.write(f"Sequential max response time: {round(max(seq_times), 2)}s\n\n")
+        if seq_summary['measured']:
+            f.write(f"Sequential avg response time: {round(seq_summary['avg_duration'], 2)}s\n")
+            f.write(f"Sequential max response time: {round(seq_summary['max_duration'], 2)}s\n\n")
 
-        if conc_successful:
-            conc_times = [r['duration'] for r in conc_successful]
-            f.write(f"Concurrent avg response time: {round(sum(conc_times)/len(conc_times), 2)}s\n")
-            f.write(f"Concurrent max response time: {round(max(conc_times), 2)}s\n\n")
+        if conc_summary['measured']:
+            f.write(f"Concurrent avg response time: {round(conc_summary['avg_duration'], 2)}s\n")
+            f.write(f"Concurrent max response time: {round(conc_summary['max_duration'], 2)}s\n\n")
 
         f.write(f"Speedup: {comparison_data['speedup']}x\n")
         f.write(f"Time saved: {comparison_data['time_saved']}s\n\n")
+        if comparison_data['cached_results']:
+            f.write(f"⚠ {comparison_data['cached_results']} response(s) were served from cache; "
+                    "the speedup does not reflect API concurrency.\n\n")
 
         # Recommendations
         f.write("-" * 80 + "\n")
         f.write("RECOMMENDATIONS\n")
         f.write("-" * 80 + "\n\n")
 
-        if conc_successful:
-            avg_conc_time = sum([r['duration'] for r in conc_successful]) / len(conc_successful)
+        if conc_summary['measured']:
+            avg_conc_time = conc_summary['avg_duration']
             if avg_conc_time < 2:
                 f.write("✓ EXCELLENT: Response times are under 2 seconds - ideal for interactive use\n")
             elif avg_conc_time < 5:
@@ -560,34 +1358,53 @@ def save_diagnostics(sequential_data, concurrent_data, comparison_data, timestam
     return diag_filename
 
 
-def save_results(sequential_data, concurrent_data, comparison_data):
+def save_results(sequential_data, concurrent_data, batched_data, comparison_data):
     """
     Save detailed results to JSON file and responses to text files
     """
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    # One clock reading so every output file reports the same time
+    now = datetime.now()
+    timestamp = now.strftime("%Y%m%d_%H%M%S")
+    test_date = now.isoformat()
 
     # Save JSON results
     json_filename = f"test_results_{timestamp}.json"
     output = {
-        "timestamp": datetime.now().isoformat(),
+        "timestamp": now,  # datetime is encoded to ISO 8601 by the serializer
         "configuration": {
             "num_requests": NUM_REQUESTS,
+            "concurrency_limit": CONCURRENCY_LIMIT,
+            "rate_limit_rpm": rate_limiter.rpm if rate_limiter is not None else None,
             "model": MODEL,
-            "max_tokens": MAX_TOKENS
+            "max_tokens": MAX_TOKENS,
+            "temperature": TEMPERATURE,
+            "use_cache": USE_CACHE,
+            "semantic_cache": semantic_cache is not None
         },
+        "cache_stats": cache_stats,
+        "semantic_cache_stats": {
+            "hits": semantic_cache.hits,
+            "misses": semantic_cache.misses,
+            "hit_rate": round(semantic_cache.hit_rate(), 3)
+        } if semantic_cache is not None else None,
         "sequential": sequential_data,
         "concurrent": concurrent_data,
+        "batched": batched_data,
         "comparison": comparison_data
     }
 
-    with open(json_filename, 'w') as f:
-        json.dump(output, f, indent=2)
+    if orjson is not None:
+        with open(json_filename, 'wb') as f:
+            f.write(orjson.dumps(output, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+    else:
+        with open(json_filename, 'w') as f:
+            json.dump(output, f, indent=2, default=datetime.isoformat)
 
     # Save text responses for manual examination
     seq_file, conc_file = save_responses_to_text(sequential_data, concurrent_data, timestamp)
 
     # Save diagnostics report
-    diag_file = save_diagnostics(sequential_data, concurrent_data, comparison_data, timestamp)
+    diag_file = save_diagnostics(sequential_data, concurrent_data, comparison_data, timestamp, test_date)
 
     print(f"\n📄 Detailed results saved to: {json_filename}")
     print(f"📄 Sequential responses saved to: {seq_file}")
@@ -595,18 +1412,109 @@ def save_results(sequential_data, concurrent_data, comparison_data):
     print(f"📄 Diagnostic report saved to: {diag_file}")
 
 
+def positive_int(value):
+    """
+    argparse type for options that must be at least 1
+    """
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be a positive integer, got {value}")
+    return number
+
+
+def non_negative_int(value):
+    """
+    argparse type for options where 0 means "off"
+    """
+    number = int(value)
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"must be zero or a positive integer, got {value}")
+    return number
+
+
+def parse_args():
+    """
+    Parse command line options
+    """
+    parser = argparse.ArgumentParser(description="OpenAI API Concurrency Test")
+    parser.add_argument(
+        "--num-requests",
+        type=positive_int,
+        default=NUM_REQUESTS,
+        help=f"Number of requests per test; prompts are cycled past {len(TEST_PROMPTS)} (default: {NUM_REQUESTS})"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=positive_int,
+        default=CONCURRENCY_LIMIT,
+        help=f"Max requests in flight during the concurrent test (default: {CONCURRENCY_LIMIT})"
+    )
+    parser.add_argument(
+        "--model",
+        default=MODEL,
+        help=f"OpenAI model to use (default: {MODEL})"
+    )
+    parser.add_argument(
+        "--rpm",
+        type=non_negative_int,
+        default=RATE_LIMIT_RPM,
+        help="Pace request starts to this many requests per minute (default: no pacing)"
+    )
+    parser.add_argument(
+        "--use-cache",
+        action="store_true",
+        help=f"Serve repeated prompts from the on-disk response cache in {CACHE_PATH} "
+             "(always on when TEMPERATURE is 0)"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Disable the response cache even when TEMPERATURE is 0"
+    )
+    parser.add_argument(
+        "--verbose",
+        action="store_true",
+        help="Print progress live as requests run instead of buffering it"
+    )
+    parser.add_argument(
+        "--semantic-cache",
+        action="store_true",
+        help=f"Serve near-duplicate prompts (cosine similarity > {SEMANTIC_SIMILARITY_THRESHOLD}) "
+             f"from the embedding cache in {SEMANTIC_CACHE_PATH}"
+    )
+    return parser.parse_args()
+
+
 def main():
     """
     Main test execution
     """
+    global NUM_REQUESTS, MODEL, CONCURRENCY_LIMIT, USE_CACHE, VERBOSE, rate_limiter, semantic_cache
+
+    args = parse_args()
+    NUM_REQUESTS = args.num_requests
+    MODEL = args.model
+    CONCURRENCY_LIMIT = args.concurrency
+    if args.rpm > 0:
+        rate_limiter = RequestRateLimiter(args.rpm)
+    USE_CACHE = (USE_CACHE or args.use_cache) and not args.no_cache
+    VERBOSE = args.verbose
+    if args.semantic_cache:
+        semantic_cache = SemanticCache(SEMANTIC_CACHE_PATH, SEMANTIC_SIMILARITY_THRESHOLD)
+
     print("\n")
     print("╔" + "═" * 78 + "╗")
     print("║" + " " * 20 + "OpenAI API Concurrency Test" + " " * 31 + "║")
     print("╚" + "═" * 78 + "╝")
     print(f"\nConfiguration:")
     print(f"  • Number of requests: {NUM_REQUESTS}")
+    print(f"  • Concurrency limit: {CONCURRENCY_LIMIT}")
+    print(f"  • Rate limit: {f'{args.rpm} requests/min' if rate_limiter is not None else 'none'}")
     print(f"  • Model: {MODEL}")
     print(f"  • Max tokens per request: {MAX_TOKENS}")
+    print(f"  • HTTP/2: {'✓ Enabled' if HTTP2_ENABLED else '✗ Disabled (pip install h2)'}")
+    print(f"  • Response cache: {'✓ Enabled' if USE_CACHE else '✗ Disabled'}")
+    print(f"  • Semantic cache: {'✓ Enabled' if semantic_cache is not None else '✗ Disabled'}")
     print(f"  • API Key: {'✓ Found' if os.getenv('OPENAI_API_KEY') else '✗ Not found'}")
     print()
 
@@ -616,20 +1524,28 @@ def main():
         print("Please set it with: export OPENAI_API_KEY='your-api-key'")
         return
 
+    # Use uvloop for the event loop when available
+    if uvloop is not None:
+        uvloop.install()
+
     # Run tests
     try:
-        sequential_data = test_sequential()
-        concurrent_data = test_concurrent()
-        comparison_data = compare_results(sequential_data, concurrent_data)
+        sequential_data, concurrent_data, batched_data = asyncio.run(run_tests())
+        comparison_data = compare_results(sequential_data, concurrent_data, batched_data)
+
+        if USE_CACHE:
+            print(f"\nResponse cache: {cache_stats['hits']} hit(s), {cache_stats['misses']} miss(es)")
+        if semantic_cache is not None:
+            semantic_cache.save()
+            print(f"Semantic cache: {semantic_cache.hits} hit(s), {semantic_cache.misses} miss(es) "
+                  f"({round(semantic_cache.hit_rate() * 100, 1)}% hit rate)")
 
         # Save results
-        save_results(sequential_data, concurrent_data, comparison_data)
+        save_results(sequential_data, concurrent_data, batched_data, comparison_data)
 
         print("\n✓ Test completed successfully!\n")
 
-        # Final cleanup
-        import gc
-        http_client.close()
+        # Final cleanup (the HTTP client is closed when run_tests() returns)
         gc.collect()
         print("Resources cleaned up. Safe to run again.\n")
 